@@ -3,29 +3,130 @@
 # ===========================
 # Purpose: Load transformed Telco Churn dataset into Supabase using Supabase client
 
+import functools
 import os
-import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+import httpx
 import pandas as pd
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+# orjson serializes in C (and handles NumPy scalars natively); fall back
+# to the stdlib with an .item() shim when it isn't installed
+try:
+    import orjson
+
+    def _dumps(records) -> bytes:
+        return orjson.dumps(records, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    import json
+
+    def _json_default(obj):
+        if hasattr(obj, "item"):  # NumPy scalar
+            return obj.item()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _dumps(records) -> bytes:
+        return json.dumps(records, default=_json_default).encode()
+
+load_dotenv()  # read .env once at import, not on every client call
+
+# Parquet staging support (transform.py writes Parquet when pyarrow
+# is installed)
+try:
+    from pyarrow import parquet as pa_parquet
+except ImportError:
+    pa_parquet = None
 
-BATCH_SIZE = 200
+# 13 columns × 1000 rows = 13k bound parameters, well under PostgreSQL's
+# 65535 cap; larger batches amortize HTTP/TLS and PostgREST parse overhead.
+BATCH_SIZE = 1000
 MAX_RETRIES = 3
+MAX_WORKERS = 8  # in-flight batches; wall time is dominated by network RTT
+
+# Columns that match the telco_churn table schema
+REQUIRED_COLS = [
+    "tenure",
+    "MonthlyCharges",
+    "TotalCharges",
+    "Churn",
+    "InternetService",
+    "Contract",
+    "PaymentMethod",
+    "tenure_group",
+    "monthly_charge_segment",
+    "has_internet_service",
+    "is_multi_line_user",
+    "contract_type_code",
+]
+
+# Columns transform_data guarantees are never null — the record builder
+# skips the NaN scan for these entirely
+NON_NULLABLE_COLS = {"tenure", "has_internet_service", "is_multi_line_user"}
+
+# Explicit dtypes so pandas doesn't re-infer per chunk. The charge
+# columns stay float64: narrowing to float32 would widen back to double
+# at JSON time and insert values like 29.850000381469727.
+CSV_DTYPES = {
+    "tenure": "int32",
+    "MonthlyCharges": "float64",
+    "TotalCharges": "float64",
+    "Churn": "str",
+    "InternetService": "str",
+    "Contract": "str",
+    "PaymentMethod": "str",
+    "tenure_group": "str",
+    "monthly_charge_segment": "str",
+    "has_internet_service": "int8",
+    "is_multi_line_user": "int8",
+    "contract_type_code": "Int64",  # nullable integer
+}
 
 # ------------------------------------------------------
 # Supabase client
 # ------------------------------------------------------
+@functools.lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Initialize and return Supabase client."""
-    load_dotenv()
+    """Initialize and return the Supabase client (memoized).
+
+    One client means one TLS handshake and one connection pool; the
+    underlying httpx client is thread-safe, so the insert workers share
+    it and reuse keep-alive connections across batches.
+    """
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
-   
+
     if not url or not key:
         raise ValueError("❌ Missing SUPABASE_URL or SUPABASE_KEY in .env")
-       
+
     return create_client(url, key)
- 
+
+
+@functools.lru_cache(maxsize=None)
+def _get_rest_endpoint(table_name: str):
+    """Return the PostgREST URL and headers for direct inserts."""
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+
+    if not url or not key:
+        raise ValueError("❌ Missing SUPABASE_URL or SUPABASE_KEY in .env")
+
+    headers = {
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal",
+    }
+    return f"{url}/rest/v1/{table_name}", headers
+
+
+@functools.lru_cache(maxsize=1)
+def _get_http_client() -> httpx.Client:
+    """Shared httpx client: one pool of keep-alive connections for all workers."""
+    return httpx.Client(timeout=30.0)
+
 # ------------------------------------------------------
 # Step 1: Create table if not exists
 # ------------------------------------------------------
@@ -69,100 +170,334 @@ def create_table_if_not_exists(table_name: str = "telco_churn"):
 # ------------------------------------------------------
 # Step 2: Load CSV data into Supabase table
 # ------------------------------------------------------
-def load_to_supabase(staged_path: str, table_name: str = "telco_churn"):
+def _records_from_chunk(chunk: pd.DataFrame):
+    """Convert one CSV chunk into a list of JSON-ready record dicts.
+
+    Builds records column-by-column from NumPy object arrays instead of
+    `chunk.to_dict('records')`, which boxes every cell through pandas and
+    is several times slower. NaN -> None happens once per column, and
+    only on columns that can actually hold nulls: transform_data
+    guarantees NON_NULLABLE_COLS are clean, and for the rest the
+    conversion short-circuits when the chunk has no missing values
+    (the normal case after transform).
+    """
+    col_arrays = {}
+    for col in chunk.columns:
+        arr = chunk[col].astype(object).to_numpy()
+        if col not in NON_NULLABLE_COLS:
+            mask = pd.isna(arr)
+            if mask.any():
+                arr[mask] = None  # proper NULL handling in JSON
+        col_arrays[col] = arr
+
+    # Bind as locals so the hot comprehension skips global lookups
+    cols_local = list(chunk.columns)
+    arrs_local = col_arrays
+
+    return [
+        {c: arrs_local[c][j] for c in cols_local}
+        for j in range(len(chunk))
+    ]
+
+
+def _iter_batches(reader):
+    """Yield (batch_number, records) for each chunk of the CSV reader."""
+    for batch_number, chunk in enumerate(reader, start=1):
+        yield batch_number, _records_from_chunk(chunk)
+
+
+def _iter_df_batches(df: pd.DataFrame, batch_size: int, cols=None):
+    """Yield (batch_number, records) from batch_size slices of a DataFrame.
+
+    Unlike the streaming CSV path, the whole frame is already in memory,
+    so the object conversion and NaN -> None fix-up run once up front per
+    column — not once per batch — and each batch is just a slice of the
+    prepared arrays. Columns that turn out to have no missing values
+    skip the masked assignment entirely. Columns are pulled straight off
+    the source frame, so no df[cols] projection (which consolidates and
+    copies the selected blocks) is ever made.
+    """
+    cols = list(cols) if cols is not None else list(df.columns)
+
+    col_arrays = {}
+    for col in cols:
+        arr = df[col].astype(object).to_numpy()
+        if col not in NON_NULLABLE_COLS:
+            mask = pd.isna(arr)
+            if mask.any():
+                arr[mask] = None  # proper NULL handling in JSON
+        col_arrays[col] = arr
+
+    # Bind as locals so the hot comprehension skips global lookups
+    cols_local = cols
+    arrs_local = col_arrays
+
+    total_rows = len(df)
+    for i in range(0, total_rows, batch_size):
+        end = min(i + batch_size, total_rows)
+        records = [
+            {c: arrs_local[c][j] for c in cols_local}
+            for j in range(i, end)
+        ]
+        yield i // batch_size + 1, records
+
+
+def _iter_parquet_batches(staged_path: str, batch_size: int):
+    """Yield (batch_number, records) from a staged Parquet file.
+
+    Arrow RecordBatches convert straight to row dicts via to_pylist():
+    nulls arrive as None and values as native Python types, so no NaN
+    conversion or pandas boxing is needed at all.
+    """
+    parquet_file = pa_parquet.ParquetFile(staged_path)
+    batches = parquet_file.iter_batches(batch_size=batch_size, columns=REQUIRED_COLS)
+    for batch_number, batch in enumerate(batches, start=1):
+        yield batch_number, batch.to_pylist()
+
+
+def _is_retryable_error(exc: BaseException) -> bool:
+    """Retry only transient failures: transport errors, 5xx and 429.
+
+    Permanent errors (schema mismatches, auth failures and other 4xx)
+    fail immediately instead of burning the backoff budget — important
+    with parallel workers, where a doomed retry chain would otherwise
+    hold a slot the other batches could use.
+    """
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return False
+
+
+@retry(retry=retry_if_exception(_is_retryable_error),
+       wait=wait_exponential(multiplier=1, max=10),
+       stop=stop_after_attempt(MAX_RETRIES),
+       reraise=True)
+def _post_batch(url: str, headers, body: bytes):
+    """POST one serialized batch, retrying transient failures with backoff."""
+    response = _get_http_client().post(url, content=body, headers=headers)
+    response.raise_for_status()
+
+
+def _insert_batch(records, batch_number: int, table_name: str) -> int:
+    """Insert one batch with per-batch retries.
+
+    Returns the number of rows inserted (0 on failure). POSTs straight
+    to PostgREST instead of going through the Supabase client's
+    request/response model layer — the JSON body is serialized once here
+    and reused across retries. The Prefer: return=minimal header keeps
+    the response body empty.
+    """
+    url, headers = _get_rest_endpoint(table_name)
+    body = _dumps(records)
+
+    try:
+        _post_batch(url, headers, body)
+    except Exception as e:
+        print(f"❌ Batch {batch_number} failed: {e}")
+        return 0
+
+    print(f"✅ Batch {batch_number}: Inserted {len(records)} rows")
+    return len(records)
+
+
+def load_to_supabase(staged_path: str = None, table_name: str = "telco_churn",
+                     batch_size: int = BATCH_SIZE, df: pd.DataFrame = None):
+    """
+    Load transformed data into a Supabase table.
+
+    Args:
+        staged_path (str): Path to the transformed CSV file.
+        table_name (str): Supabase table name. Default is 'telco_churn'.
+        batch_size (int): Rows per insert request. Default is BATCH_SIZE.
+        df (pd.DataFrame): In-memory transformed data to load instead of
+            reading staged_path (used by the orchestrated pipeline).
+    """
+    if df is None and staged_path is None:
+        print("❌ Error: provide either staged_path or df")
+        return
+
+    if df is not None:
+        missing = [c for c in REQUIRED_COLS if c not in df.columns]
+        if missing:
+            print(f"❌ Missing required columns in DataFrame: {missing}")
+            return
+        batches = _iter_df_batches(df, batch_size, REQUIRED_COLS)
+        source = f"{len(df)} in-memory rows"
+    else:
+        # Convert to absolute path
+        if not os.path.isabs(staged_path):
+            staged_path = os.path.abspath(os.path.join(os.path.dirname(__file__), staged_path))
+
+        print(f"🔍 Looking for data file at: {staged_path}")
+
+        if not os.path.exists(staged_path):
+            print(f"❌ Error: File not found at {staged_path}")
+            print("ℹ️  Please run transform.py first to generate the transformed data")
+            return
+
+        # Stream the staged file in batch-sized chunks instead of
+        # materializing the whole DataFrame: each chunk is exactly one
+        # insert batch, so peak memory stays at roughly
+        # MAX_WORKERS × batch_size rows.
+        if staged_path.endswith(".parquet"):
+            if pa_parquet is None:
+                print("❌ pyarrow is required to read Parquet staged data")
+                return
+            batches = _iter_parquet_batches(staged_path, batch_size)
+        else:
+            try:
+                reader = pd.read_csv(
+                    staged_path,
+                    usecols=REQUIRED_COLS,
+                    dtype=CSV_DTYPES,
+                    chunksize=batch_size,
+                )
+            except ValueError as e:
+                print(f"❌ Missing required columns in CSV: {e}")
+                return
+            batches = _iter_batches(reader)
+        source = f"'{staged_path}'"
+
+    try:
+        # Fail fast on missing credentials before dispatching batches
+        _get_rest_endpoint(table_name)
+
+        print(f"📊 Loading {source} into '{table_name}' "
+              f"({batch_size} rows per batch, {MAX_WORKERS} workers)...")
+
+        # Dispatch batches concurrently: the POSTs block on HTTP I/O, so
+        # threads overlap the round-trips. Submission is throttled so
+        # only a bounded number of chunks is in flight at once.
+        ok = 0
+        failed = 0
+        rows_loaded = 0
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pending = set()
+            for batch_number, records in batches:
+                pending.add(executor.submit(_insert_batch, records, batch_number, table_name))
+                if len(pending) >= MAX_WORKERS * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        inserted = future.result()
+                        if inserted:
+                            ok += 1
+                            rows_loaded += inserted
+                        else:
+                            failed += 1
+            for future in as_completed(pending):
+                inserted = future.result()
+                if inserted:
+                    ok += 1
+                    rows_loaded += inserted
+                else:
+                    failed += 1
+
+        print(f"🎯 Finished loading {rows_loaded} rows into '{table_name}' "
+              f"({ok} batches inserted, {failed} failed).")
+
+    except Exception as e:
+        print(f"❌ Error loading data: {e}")
+ 
+# ------------------------------------------------------
+# Step 2b: Bulk load over the Postgres wire protocol
+# ------------------------------------------------------
+def load_via_copy(staged_path: str, table_name: str = "telco_churn"):
     """
-    Load a transformed CSV into a Supabase table.
+    Load a transformed CSV into Supabase with COPY FROM STDIN.
+
+    Streams the whole file over one Postgres connection instead of JSON
+    row inserts through PostgREST — no JSON encode/decode and a single
+    round-trip, so it ingests tens of thousands of rows per second.
+    Requires the direct connection string (SUPABASE_DB_URL in .env);
+    use load_to_supabase when only the REST anon key is available.
 
     Args:
         staged_path (str): Path to the transformed CSV file.
         table_name (str): Supabase table name. Default is 'telco_churn'.
     """
-    # Convert to absolute path
+    try:
+        import psycopg
+    except ImportError:
+        print("❌ psycopg is not installed; falling back is required (pip install psycopg)")
+        return
+
+    db_url = os.getenv("SUPABASE_DB_URL")
+    if not db_url:
+        print("❌ Missing SUPABASE_DB_URL in .env (direct Postgres connection string)")
+        return
+
     if not os.path.isabs(staged_path):
         staged_path = os.path.abspath(os.path.join(os.path.dirname(__file__), staged_path))
-   
-    print(f"🔍 Looking for data file at: {staged_path}")
-   
+
     if not os.path.exists(staged_path):
         print(f"❌ Error: File not found at {staged_path}")
-        print("ℹ️  Please run transform.py first to generate the transformed data")
         return
- 
+
+    print(f"📊 Bulk loading '{staged_path}' into '{table_name}' via COPY...")
+
+    col_list = ", ".join(f'"{c}"' for c in REQUIRED_COLS)
+    copy_sql = f"COPY public.{table_name} ({col_list}) FROM STDIN WITH (FORMAT CSV)"
+
     try:
-        supabase = get_supabase_client()
-       
-        # Read full CSV
-        df = pd.read_csv(staged_path)
-
-        # Keep only columns that match table schema
-        required_cols = [
-            "tenure",
-            "MonthlyCharges",
-            "TotalCharges",
-            "Churn",
-            "InternetService",
-            "Contract",
-            "PaymentMethod",
-            "tenure_group",
-            "monthly_charge_segment",
-            "has_internet_service",
-            "is_multi_line_user",
-            "contract_type_code",
-        ]
+        if staged_path.endswith(".parquet"):
+            if pa_parquet is None:
+                print("❌ pyarrow is required to read Parquet staged data")
+                return
+            reader = (
+                batch.to_pandas()
+                for batch in pa_parquet.ParquetFile(staged_path).iter_batches(
+                    batch_size=BATCH_SIZE, columns=REQUIRED_COLS
+                )
+            )
+        else:
+            reader = pd.read_csv(
+                staged_path,
+                usecols=REQUIRED_COLS,
+                dtype=CSV_DTYPES,
+                chunksize=BATCH_SIZE,
+            )
+        total_rows = 0
+        with psycopg.connect(db_url) as conn:
+            with conn.cursor() as cur:
+                with cur.copy(copy_sql) as copy:
+                    for chunk in reader:
+                        # Reorder to the COPY column list; NaN -> empty
+                        # field, which CSV COPY reads as NULL
+                        copy.write(chunk[REQUIRED_COLS].to_csv(index=False, header=False))
+                        total_rows += len(chunk)
 
-        missing = [c for c in required_cols if c not in df.columns]
-        if missing:
-            print(f"❌ Missing required columns in CSV: {missing}")
-            return
+        print(f"🎯 Finished bulk loading {total_rows} rows into '{table_name}'.")
 
-        df = df[required_cols]
-
-        total_rows = len(df)
-        print(f"📊 Loading {total_rows} rows into '{table_name}'...")
-
-        # Process in batches
-        for i in range(0, total_rows, BATCH_SIZE):
-            batch = df.iloc[i:i + BATCH_SIZE].copy()
-
-            # Convert NaN to None for proper NULL handling
-            batch = batch.where(pd.notnull(batch), None)
-            records = batch.to_dict('records')
-
-            batch_number = i // BATCH_SIZE + 1
-            attempt = 1
-
-            while attempt <= MAX_RETRIES:
-                try:
-                    response = supabase.table(table_name).insert(records).execute()
-                    # For new supabase-py, errors typically raise exceptions,
-                    # but we keep this extra check just in case:
-                    if hasattr(response, "error") and response.error:
-                        raise Exception(response.error)
-                   
-                    end = min(i + BATCH_SIZE, total_rows)
-                    print(f"✅ Batch {batch_number}: Inserted rows {i+1}-{end} of {total_rows}")
-                    break  # success → exit retry loop
-
-                except Exception as e:
-                    print(f"⚠️  Error in batch {batch_number}, attempt {attempt}: {str(e)}")
-                    if attempt == MAX_RETRIES:
-                        print(f"❌ Max retries reached for batch {batch_number}. Skipping this batch.")
-                        break
-                    wait_time = 2 * attempt
-                    print(f"⏳ Retrying batch {batch_number} in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    attempt += 1
- 
-        print(f"🎯 Finished loading data into '{table_name}'.")
- 
     except Exception as e:
-        print(f"❌ Error loading data: {e}")
- 
+        print(f"❌ Error bulk loading data: {e}")
+
+
 # ------------------------------------------------------
 # Step 3: Run as standalone script
 # ------------------------------------------------------
 if __name__ == "__main__":
-    # Path relative to the script location
-    staged_csv_path = os.path.join("..", "data", "staged", "churn_transformed.csv")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load transformed Telco data into Supabase")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Rows per insert request (default: {BATCH_SIZE})")
+    args = parser.parse_args()
+
+    # Prefer the Parquet staged file, fall back to the legacy CSV
+    staged_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "..", "data", "staged")
+    staged_parquet_path = os.path.join(staged_dir, "churn_transformed.parquet")
+    if os.path.exists(staged_parquet_path):
+        staged_file_path = staged_parquet_path
+    else:
+        staged_file_path = os.path.join(staged_dir, "churn_transformed.csv")
     create_table_if_not_exists()
-    load_to_supabase(staged_csv_path)
+    # Prefer COPY over the Postgres wire protocol when a direct
+    # connection string is configured; REST inserts otherwise.
+    if os.getenv("SUPABASE_DB_URL"):
+        load_via_copy(staged_file_path)
+    else:
+        load_to_supabase(staged_file_path, batch_size=args.batch_size)
@@ -0,0 +1,47 @@
+# ===========================
+# pipeline.py
+# ===========================
+# Purpose: Run the full Telco Churn ETL (extract → transform → load →
+# validate) as one in-memory pipeline, skipping the intermediate CSV
+# round-trips that the standalone scripts pay for.
+
+import argparse
+
+from extract import extract_data
+from transform import transform_data
+from load import BATCH_SIZE, create_table_if_not_exists, load_to_supabase
+from validation import validate
+
+
+def run_pipeline(persist_staged=False, batch_size=BATCH_SIZE):
+    """
+    Run the whole ETL hand-to-hand in memory.
+
+    The standalone scripts write churn_raw.csv, re-read it, write
+    churn_transformed.csv, then re-read both for validation — 2 writes
+    and 3 reads of the same data. Here each stage passes its DataFrame
+    straight to the next; only the raw extract is persisted (and the
+    staged file too, when persist_staged is True).
+
+    Args:
+        persist_staged: Also write data/staged/churn_transformed.csv.
+        batch_size: Rows per Supabase insert request.
+    """
+    raw_df = extract_data(return_df=True)
+    staged_df = transform_data(raw_df, persist=persist_staged)
+
+    create_table_if_not_exists()
+    load_to_supabase(df=staged_df, batch_size=batch_size)
+
+    validate(raw_df=raw_df, df=staged_df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full Telco Churn ETL pipeline")
+    parser.add_argument("--persist-staged", action="store_true",
+                        help="Also write the transformed data to data/staged")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Rows per insert request (default: {BATCH_SIZE})")
+    args = parser.parse_args()
+
+    run_pipeline(persist_staged=args.persist_staged, batch_size=args.batch_size)
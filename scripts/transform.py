@@ -2,37 +2,170 @@ import os
 import numpy as np
 import pandas as pd
 
-
-def transform_data():
+# Prefer pyarrow's multithreaded C++ CSV parser (and Parquet staging)
+# when available
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+    HAS_PYARROW = True
+except ImportError:
+    CSV_ENGINE = "c"
+    HAS_PYARROW = False
+
+# Polars compiles the whole transform into one fused multi-threaded
+# plan; the pandas implementation below stays as the fallback
+try:
+    import polars as pl
+    HAS_POLARS = True
+except ImportError:
+    HAS_POLARS = False
+
+# Raw columns actually used downstream — everything except customerID and
+# gender, which were previously read and then dropped at the end
+RAW_USECOLS = [
+    "SeniorCitizen",
+    "Partner",
+    "Dependents",
+    "tenure",
+    "PhoneService",
+    "MultipleLines",
+    "InternetService",
+    "OnlineSecurity",
+    "OnlineBackup",
+    "DeviceProtection",
+    "TechSupport",
+    "StreamingTV",
+    "StreamingMovies",
+    "Contract",
+    "PaperlessBilling",
+    "PaymentMethod",
+    "MonthlyCharges",
+    "TotalCharges",
+    "Churn",
+]
+
+# Explicit narrow dtypes for the integer columns: smaller frame than
+# the inferred int64 defaults, which speeds every later pass and the
+# write. MonthlyCharges stays float64 — float32 values widen back to
+# double downstream and would load imprecise charges into the DB.
+# TotalCharges stays a string here — it contains blanks and is coerced
+# to numeric during cleaning.
+RAW_DTYPES = {
+    "SeniorCitizen": "int8",
+    "tenure": "int32",
+    "MonthlyCharges": "float64",
+    "TotalCharges": "str",
+}
+
+
+def _transform_polars(lf):
+    """Build the lazy Polars plan mirroring the pandas transforms below.
+
+    Every cleaning and feature step is an expression on the same
+    LazyFrame, so Polars fuses them into one optimized multi-threaded
+    pass instead of pandas' eager column-at-a-time allocations.
+    """
+    mc = pl.col("MonthlyCharges")
+    contract = pl.col("Contract")
+
+    # Cleaning: TotalCharges blanks -> null -> median; charge medians;
+    # "Unknown" for missing strings. tenure is never null in the raw
+    # data and is left out of the median fill on purpose — fill_null
+    # with a median would supertype it to Float64, and the table schema
+    # (and the pandas path) keep it integral.
+    lf = lf.with_columns(pl.col("TotalCharges").cast(pl.Float64, strict=False))
+    lf = lf.with_columns(
+        [pl.col(c).fill_null(pl.col(c).median())
+         for c in ("MonthlyCharges", "TotalCharges")]
+    )
+    lf = lf.with_columns(pl.col(pl.String).fill_null("Unknown"))
+
+    # Feature engineering (same boundaries as the pandas path)
+    return lf.with_columns([
+        pl.col("tenure").cut(
+            [12, 36, 60], labels=["New", "Regular", "Loyal", "Champion"]
+        ).alias("tenure_group"),
+        pl.when(mc < 30).then(pl.lit("Low"))
+          .when(mc <= 70).then(pl.lit("Medium"))
+          .otherwise(pl.lit("High"))
+          .alias("monthly_charge_segment"),
+        pl.col("InternetService").is_in(["DSL", "Fiber optic"])
+          .cast(pl.Int8).alias("has_internet_service"),
+        (pl.col("MultipleLines") == "Yes").cast(pl.Int8).alias("is_multi_line_user"),
+        pl.when(contract == "Month-to-month").then(0)
+          .when(contract == "One year").then(1)
+          .when(contract == "Two year").then(2)
+          .otherwise(None)
+          .cast(pl.Int8).alias("contract_type_code"),
+    ])
+
+
+def transform_data(df=None, persist=True):
+    """
+    Clean and feature-engineer the raw Churn data.
+
+    Args:
+        df: Raw DataFrame to transform in place of re-reading the raw
+            CSV (used by the orchestrated pipeline). Reads from
+            data/raw when omitted.
+        persist: Write the transformed data to data/staged. Pass False
+            to keep the run fully in memory.
+
+    Returns the transformed DataFrame.
+    """
     # Go up one level from scripts/ to project root
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-    raw_dir = os.path.join(base_dir, "data", "raw")
     staged_dir = os.path.join(base_dir, "data", "staged")
-    os.makedirs(staged_dir, exist_ok=True)
-
-    raw_path = os.path.join(raw_dir, "churn_raw.csv")
-
-    if not os.path.exists(raw_path):
-        raise FileNotFoundError(f"❌ Raw file not found at: {raw_path}")
 
     # ------------------- LOAD -------------------
-    df = pd.read_csv(raw_path)
+    if df is None:
+        raw_path = os.path.join(base_dir, "data", "raw", "churn_raw.csv")
+
+        if not os.path.exists(raw_path):
+            raise FileNotFoundError(f"❌ Raw file not found at: {raw_path}")
+
+        if HAS_POLARS and HAS_PYARROW:
+            # Lazy scan -> fused plan -> collect: projection pushdown means
+            # only RAW_USECOLS are ever parsed from the CSV
+            out = _transform_polars(pl.scan_csv(raw_path).select(RAW_USECOLS)).collect()
+
+            if persist:
+                os.makedirs(staged_dir, exist_ok=True)
+                staged_path = os.path.join(staged_dir, "churn_transformed.parquet")
+                out.write_parquet(staged_path, compression="snappy")
+                print(f"✅ Data transformed and saved at: {staged_path}")
+            else:
+                print("✅ Data transformed in memory (staged file not written)")
+
+            return out.to_pandas()
+
+        df = pd.read_csv(raw_path, usecols=RAW_USECOLS, dtype=RAW_DTYPES,
+                         engine=CSV_ENGINE)
+    else:
+        # In-memory frame from extract_data: apply the same projection
+        # the constrained read would have done. Copy explicitly — the
+        # transforms below mutate df, and the caller's raw frame is
+        # validated afterwards.
+        df = df[[c for c in RAW_USECOLS if c in df.columns]].copy()
 
     # ------------------- CLEANING TASKS -------------------
 
     # 1) Convert TotalCharges to numeric (spaces -> NaN)
     df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
 
-    # 2) Fill missing numeric values with median
-    numeric_cols = ["tenure", "MonthlyCharges", "TotalCharges"]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna(df[col].median())
+    # 2) Fill missing numeric values with median — one vectorized sweep
+    # instead of a per-column median + fillna loop
+    numeric_cols = [c for c in ("tenure", "MonthlyCharges", "TotalCharges")
+                    if c in df.columns]
+    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
 
     # 3) Replace missing categorical values with "Unknown"
+    # (guarded: the Telco object columns normally have no NaNs, and an
+    # unconditional fillna would copy them all for nothing)
     cat_cols = df.select_dtypes(include=["object"]).columns
-    df[cat_cols] = df[cat_cols].fillna("Unknown")
+    if df[cat_cols].isna().any().any():
+        df[cat_cols] = df[cat_cols].fillna("Unknown")
 
     # ------------------- FEATURE ENGINEERING -------------------
 
@@ -41,56 +174,74 @@ def transform_data():
     # 13–36  → "Regular"
     # 37–60  → "Loyal"
     # 60+    → "Champion"
-    df["tenure_group"] = pd.cut(
-        df["tenure"],
-        bins=[-0.1, 12, 36, 60, float("inf")],
-        labels=["New", "Regular", "Loyal", "Champion"],
-        include_lowest=True,
-        right=True
+    # Single searchsorted pass over the column instead of pd.cut, and a
+    # Categorical result so the labels are stored once, not per row.
+    tenure_codes = np.searchsorted([12, 36, 60], df["tenure"].to_numpy())
+    df["tenure_group"] = pd.Categorical.from_codes(
+        tenure_codes, categories=["New", "Regular", "Loyal", "Champion"]
     )
 
     # 2) monthly_charge_segment
     # MonthlyCharges < 30  → "Low"
     # 30–70               → "Medium"
     # > 70                → "High"
-    mc = df["MonthlyCharges"]
-    conditions = [
-        mc < 30,
-        (mc >= 30) & (mc <= 70),
-        mc > 70
-    ]
-    choices = ["Low", "Medium", "High"]
-    df["monthly_charge_segment"] = np.select(conditions, choices, default="Unknown")
+    # searchsorted instead of np.select: one pass, no boolean intermediates.
+    # side="right" keeps 30 in "Medium"; the epsilon keeps 70 there too
+    # (MonthlyCharges has 2 decimals, so no real value falls inside it).
+    charge_codes = np.searchsorted(
+        [30.0, 70.0 + 1e-6], df["MonthlyCharges"].to_numpy(), side="right"
+    )
+    df["monthly_charge_segment"] = pd.Categorical.from_codes(
+        charge_codes, categories=["Low", "Medium", "High"]
+    )
 
     # 3) has_internet_service
     # "DSL" / "Fiber optic" → 1, "No" → 0
-    df["has_internet_service"] = df["InternetService"].map({
-        "DSL": 1,
-        "Fiber optic": 1,
-        "No": 0
-    }).fillna(0).astype(int)
+    # isin is a single C-level hashed membership pass; anything outside
+    # the set (including "Unknown") encodes as 0, like the old fillna(0).
+    df["has_internet_service"] = (
+        df["InternetService"].isin(("DSL", "Fiber optic")).astype("int8")
+    )
 
     # 4) is_multi_line_user
     # 1 if MultipleLines == "Yes", else 0
-    df["is_multi_line_user"] = (df["MultipleLines"] == "Yes").astype(int)
+    df["is_multi_line_user"] = (df["MultipleLines"] == "Yes").astype("int8")
 
     # 5) contract_type_code
     # Month-to-month → 0, One year → 1, Two year → 2
-    df["contract_type_code"] = df["Contract"].map({
-        "Month-to-month": 0,
-        "One year": 1,
-        "Two year": 2
-    }).astype("Int64")  # nullable integer
+    # Same lookup-table pattern; unexpected values get -1, masked to NA
+    # to keep the nullable-integer behaviour of the old map().
+    contract_map = {"Month-to-month": 0, "One year": 1, "Two year": 2}
+    contract = df["Contract"].astype("category")
+    contract_lut = np.array(
+        [contract_map.get(c, -1) for c in contract.cat.categories],
+        dtype=np.int8,
+    )
+    contract_codes = contract_lut[contract.cat.codes.to_numpy()]
+    contract_col = pd.array(contract_codes, dtype="Int8")  # nullable integer
+    contract_col[contract_codes == -1] = pd.NA
+    df["contract_type_code"] = contract_col
 
-    # ------------------- DROP UNNECESSARY FIELDS -------------------
-    df = df.drop(["customerID", "gender"], axis=1, errors="ignore")
+    # customerID and gender are excluded at read time via RAW_USECOLS
 
     # ------------------- SAVE TO STAGED -------------------
-    staged_path = os.path.join(staged_dir, "churn_transformed.csv")
-    df.to_csv(staged_path, index=False)
-
-    print(f"✅ Data transformed and saved at: {staged_path}")
-    return staged_path
+    if persist:
+        os.makedirs(staged_dir, exist_ok=True)
+        if HAS_PYARROW:
+            # Parquet is columnar, typed and snappy-compressed: far fewer
+            # disk bytes than CSV and no re-parsing of numerics when
+            # load.py / validation.py read it back
+            staged_path = os.path.join(staged_dir, "churn_transformed.parquet")
+            df.to_parquet(staged_path, compression="snappy", index=False)
+        else:
+            staged_path = os.path.join(staged_dir, "churn_transformed.csv")
+            df.to_csv(staged_path, index=False)
+
+        print(f"✅ Data transformed and saved at: {staged_path}")
+    else:
+        print("✅ Data transformed in memory (staged file not written)")
+
+    return df
 
 
 if __name__ == "__main__":
@@ -3,18 +3,47 @@
 # ===========================
 # Purpose: Validate loaded Telco Churn data (local + Supabase)
 
+import functools
 import os
 import pandas as pd
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+load_dotenv()  # read .env once at import, not on every client call
+
+# Prefer pyarrow's multithreaded C++ CSV parser when available
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Only the columns the checks below actually touch, with explicit dtypes
+# so pandas doesn't infer them
+VALIDATION_COLS = [
+    "tenure",
+    "MonthlyCharges",
+    "TotalCharges",
+    "tenure_group",
+    "monthly_charge_segment",
+    "contract_type_code",
+]
+VALIDATION_DTYPES = {
+    "tenure": "Int32",  # nullable so a missing value fails check 1, not the read
+    "MonthlyCharges": "float32",
+    "TotalCharges": "float32",
+    "tenure_group": "str",
+    "monthly_charge_segment": "str",
+    "contract_type_code": "Int64",  # nullable integer
+}
+
 
 # ------------------------------------------------------
 # Supabase client helpers
 # ------------------------------------------------------
+@functools.lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Initialize and return Supabase client."""
-    load_dotenv()
+    """Initialize and return the Supabase client (memoized)."""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
 
@@ -24,10 +53,23 @@ def get_supabase_client() -> Client:
     return create_client(url, key)
 
 
-def get_supabase_row_count(table_name: str = "telco_churn") -> int:
-    """Return exact row count from Supabase table."""
+def get_supabase_row_count(table_name: str = "telco_churn", expected: int = None) -> int:
+    """Return row count from Supabase table.
+
+    count="exact" makes PostgreSQL run a full COUNT(*) scan, so when the
+    caller knows the count it expects, try the O(1) planner estimate
+    (count="estimated") first and only pay for the exact scan if the
+    estimate disagrees.
+    """
     supabase = get_supabase_client()
-    # count="exact" to get full row count
+
+    if expected is not None:
+        response = supabase.table(table_name).select("id", count="estimated").limit(1).execute()
+        if getattr(response, "count", None) == expected:
+            return response.count
+
+    # Exact count: either no expectation was given, or the estimate
+    # disagreed and exactness matters for the verdict
     response = supabase.table(table_name).select("id", count="exact").limit(1).execute()
     # supabase-py v2: count is on the response
     if hasattr(response, "count") and response.count is not None:
@@ -39,32 +81,84 @@ def get_supabase_row_count(table_name: str = "telco_churn") -> int:
 # ------------------------------------------------------
 # Main validation
 # ------------------------------------------------------
-def validate():
+def validate(raw_df=None, df=None):
+    """
+    Validate the transformed data against the raw data and Supabase.
+
+    Args:
+        raw_df: Raw DataFrame to validate against instead of re-reading
+            the raw CSV (used by the orchestrated pipeline).
+        df: Transformed DataFrame to validate instead of re-reading the
+            staged file.
+    """
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-    raw_path = os.path.join(base_dir, "data", "raw", "churn_raw.csv")
-    staged_path = os.path.join(base_dir, "data", "staged", "churn_transformed.csv")
-
-    if not os.path.exists(raw_path):
-        print(f"❌ Raw file not found at: {raw_path}")
-        return
-
-    if not os.path.exists(staged_path):
-        print(f"❌ Transformed file not found at: {staged_path}")
-        print("ℹ️  Please run transform.py first.")
-        return
-
-    raw_df = pd.read_csv(raw_path)
-    df = pd.read_csv(staged_path)
+    if raw_df is None:
+        raw_path = os.path.join(base_dir, "data", "raw", "churn_raw.csv")
+
+        if not os.path.exists(raw_path):
+            print(f"❌ Raw file not found at: {raw_path}")
+            return
+
+        # Only customerID is needed from the raw file (unique-row check)
+        try:
+            raw_df = pd.read_csv(raw_path, usecols=["customerID"], engine=CSV_ENGINE)
+        except ValueError:
+            raw_df = pd.read_csv(raw_path, engine=CSV_ENGINE)
+
+    if df is None:
+        staged_dir = os.path.join(base_dir, "data", "staged")
+        parquet_path = os.path.join(staged_dir, "churn_transformed.parquet")
+        csv_path = os.path.join(staged_dir, "churn_transformed.csv")
+
+        if os.path.exists(parquet_path):
+            # Parquet staging: typed and columnar, so only the validated
+            # columns are even read from disk
+            try:
+                df = pd.read_parquet(parquet_path, columns=VALIDATION_COLS)
+            except (KeyError, ValueError):
+                df = pd.read_parquet(parquet_path)
+        elif os.path.exists(csv_path):
+            # Load only the validated columns with explicit dtypes
+            try:
+                df = pd.read_csv(csv_path, usecols=VALIDATION_COLS,
+                                 dtype=VALIDATION_DTYPES, engine=CSV_ENGINE)
+            except ValueError:
+                df = pd.read_csv(csv_path, engine=CSV_ENGINE)
+        else:
+            print(f"❌ Transformed file not found at: {parquet_path}")
+            print("ℹ️  Please run transform.py first.")
+            return
 
     print("🔍 Starting validation...\n")
 
+    # Gather per-column stats up front so every column is scanned once,
+    # instead of one full pass per check below.
+    numeric_cols = ["tenure", "MonthlyCharges", "TotalCharges"]
+    present_numeric = [c for c in numeric_cols if c in df.columns]
+    has_na = df[present_numeric].isna().any()
+
+    def observed_segments(col, expected):
+        """Which expected segment labels actually occur in the column.
+
+        Categorical columns (Parquet staging / in-memory frames) answer
+        from their category list after dropping unused categories — one
+        cheap codes scan, since transform declares every label up front
+        even when it has zero rows. Otherwise each expected label costs
+        one C-level equality pass, which beats a full unique() hash of
+        the column for these tiny label sets.
+        """
+        if col not in df.columns:
+            return set()
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return expected & set(series.cat.remove_unused_categories().cat.categories)
+        return {v for v in expected if (series == v).any()}
+
     checks = []
 
     # 1) No missing values in tenure, MonthlyCharges, TotalCharges
-    numeric_cols = ["tenure", "MonthlyCharges", "TotalCharges"]
-    missing_numeric = {col: int(df[col].isna().sum()) for col in numeric_cols if col in df.columns}
-    no_missing_numeric = all(count == 0 for count in missing_numeric.values())
+    no_missing_numeric = not has_na.any()
     checks.append(("No missing values in tenure, MonthlyCharges, TotalCharges", no_missing_numeric))
 
     if no_missing_numeric:
@@ -91,7 +185,7 @@ def validate():
     supabase_ok = False
     supabase_count = None
     try:
-        supabase_count = get_supabase_row_count("telco_churn")
+        supabase_count = get_supabase_row_count("telco_churn", expected=transformed_rows)
         supabase_ok = (supabase_count == transformed_rows)
     except Exception as e:
         print(f"❌ Could not get Supabase row count: {e}")
@@ -109,10 +203,7 @@ def validate():
 
     # 4) All tenure_group segments exist
     expected_tenure_groups = {"New", "Regular", "Loyal", "Champion"}
-    if "tenure_group" in df.columns:
-        actual_tenure_groups = set(df["tenure_group"].dropna().astype(str).unique())
-    else:
-        actual_tenure_groups = set()
+    actual_tenure_groups = observed_segments("tenure_group", expected_tenure_groups)
 
     tenure_segments_ok = expected_tenure_groups.issubset(actual_tenure_groups)
     checks.append(("All tenure_group segments exist", tenure_segments_ok))
@@ -124,10 +215,7 @@ def validate():
 
     # 5) All monthly_charge_segment segments exist
     expected_charge_segments = {"Low", "Medium", "High"}
-    if "monthly_charge_segment" in df.columns:
-        actual_charge_segments = set(df["monthly_charge_segment"].dropna().astype(str).unique())
-    else:
-        actual_charge_segments = set()
+    actual_charge_segments = observed_segments("monthly_charge_segment", expected_charge_segments)
 
     charge_segments_ok = expected_charge_segments.issubset(actual_charge_segments)
     checks.append(("All monthly_charge_segment segments exist", charge_segments_ok))
@@ -138,19 +226,22 @@ def validate():
         print(f"❌ Check 5: Missing monthly_charge_segment segments. Found: {actual_charge_segments}")
 
     # 6) Contract codes only {0,1,2}
-    allowed_codes = {0, 1, 2}
+    # One C-level isin pass instead of hashing the column's uniques
+    allowed_codes = [0, 1, 2]
     if "contract_type_code" in df.columns:
-        actual_codes = set(df["contract_type_code"].dropna().unique())
+        codes = df["contract_type_code"].dropna()
+        contract_codes_ok = len(codes) > 0 and codes.isin(allowed_codes).all()
     else:
-        actual_codes = set()
+        codes = None
+        contract_codes_ok = False
 
-    contract_codes_ok = actual_codes.issubset(allowed_codes) and len(actual_codes) > 0
     checks.append(("Contract codes are only {0,1,2}", contract_codes_ok))
 
     if contract_codes_ok:
-        print(f"✅ Check 6: contract_type_code values valid: {actual_codes}")
+        print(f"✅ Check 6: contract_type_code values all within {set(allowed_codes)}")
     else:
-        print(f"❌ Check 6: Invalid contract_type_code values found: {actual_codes}")
+        invalid = set(codes.unique()) - set(allowed_codes) if codes is not None else set()
+        print(f"❌ Check 6: Invalid contract_type_code values found: {invalid}")
 
     # -------- Summary --------
     print("\n============================")